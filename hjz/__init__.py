@@ -0,0 +1,34 @@
+"""
+Shared building blocks for the HugeJumpingZombie assistant scripts.
+
+The pipeline pieces live in submodules (capture, transcription, vision, tts,
+overlay, pipeline) that are imported on first attribute access.  GUI, audio
+and OpenAI libraries are only loaded when a backend actually needs them; set
+HJZ_HEADLESS=1 (or call hjz.backends.set_headless()) to never load the GUI and
+audio ones at all.
+
+Install it once from the repository root with `pip install -e .` (the conda
+environment in environment/ does this); the scripts then import hjz from
+wherever they are run.
+"""
+import importlib
+
+__all__ = [
+    "backends",
+    "capture",
+    "headless",
+    "overlay",
+    "pipeline",
+    "router",
+    "scheduler",
+    "scheduler_server",
+    "transcription",
+    "tts",
+    "vision",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
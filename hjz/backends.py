@@ -0,0 +1,87 @@
+"""
+Registry of the pluggable pipeline backends.
+
+Each slot (recorder, screenshot, player, overlay) has named implementations
+registered as "module:attribute" strings, so nothing heavy is imported until
+a backend is used for the first time.  The "desktop" implementations need the
+GUI and audio libraries; the "headless" ones need none of them and are
+selected by default when HJZ_HEADLESS=1 is set or set_headless() is called.
+"""
+import importlib
+import os
+import threading
+
+DESKTOP = "desktop"
+HEADLESS = "headless"
+
+_registry = {
+    "recorder": {
+        DESKTOP: "hjz.capture:record_audio_until_key_release",
+        HEADLESS: "hjz.headless:record_audio",
+    },
+    "screenshot": {
+        DESKTOP: "hjz.capture:take_screenshot",
+        HEADLESS: "hjz.headless:take_screenshot",
+    },
+    "player": {
+        DESKTOP: "hjz.tts:play_audio",
+        HEADLESS: "hjz.headless:play_audio",
+    },
+    "overlay": {
+        DESKTOP: "hjz.overlay:show_overlay",
+        HEADLESS: "hjz.headless:show_overlay",
+    },
+}
+_selected = {}
+_loaded = {}
+_lock = threading.Lock()
+_headless = os.getenv("HJZ_HEADLESS", "").lower() in ("1", "true", "yes")
+
+
+def is_headless():
+    return _headless
+
+
+def set_headless(enabled=True):
+    """Switch every slot without an explicit selection to its headless backend."""
+    global _headless
+    with _lock:
+        _headless = enabled
+        _loaded.clear()
+
+
+def register(slot, name, target):
+    """
+    Register a backend for `slot`.  `target` is either a callable or a
+    "module:attribute" string that is only imported when first loaded.
+    """
+    with _lock:
+        _registry.setdefault(slot, {})[name] = target
+        _loaded.pop(slot, None)
+
+
+def select(slot, name):
+    """Use the backend registered as `name` for `slot` from now on."""
+    with _lock:
+        if name not in _registry.get(slot, {}):
+            raise KeyError(f"No '{name}' backend registered for '{slot}'")
+        _selected[slot] = name
+        _loaded.pop(slot, None)
+
+
+def available(slot):
+    return sorted(_registry.get(slot, {}))
+
+
+def load(slot):
+    """Return the callable implementing `slot`, importing it on first use."""
+    with _lock:
+        backend = _loaded.get(slot)
+        if backend is None:
+            name = _selected.get(slot, HEADLESS if _headless else DESKTOP)
+            target = _registry[slot][name]
+            if isinstance(target, str):
+                module_name, _, attribute = target.partition(":")
+                target = getattr(importlib.import_module(module_name), attribute)
+            backend = _loaded[slot] = target
+        return backend
@@ -0,0 +1,58 @@
+"""
+Microphone and screen capture for the desktop pipeline.
+
+sounddevice, keyboard, scipy and pyautogui are imported inside the
+functions that need them, so importing this module stays cheap.
+"""
+import base64
+import tempfile
+
+
+def record_audio_until_key_release(key="f8", sample_rate=16000):
+    """Record audio until `key` is released."""
+    import keyboard
+    import numpy as np
+    import sounddevice as sd
+
+    print("\nRecording... Speak now!")
+    recorded_frames = []
+
+    def callback(indata, frames, time, status):
+        recorded_frames.append(indata.copy())
+
+    with sd.InputStream(samplerate=sample_rate,
+                        channels=1,
+                        dtype='int16',
+                        callback=callback):
+        while keyboard.is_pressed(key):
+            sd.sleep(50)  # check every 50ms
+
+    if not recorded_frames:
+        return np.zeros((0, 1), dtype=np.int16), sample_rate
+    audio_data = np.concatenate(recorded_frames, axis=0)
+    return audio_data, sample_rate
+
+
+def save_wav(audio, sample_rate):
+    """Save recorded samples to a temporary WAV file and return its path."""
+    from scipy.io import wavfile
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_wav:
+        wavfile.write(tmp_wav.name, sample_rate, audio)
+        return tmp_wav.name
+
+
+def take_screenshot():
+    """Take a screenshot and save it to a temporary PNG file."""
+    import pyautogui
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_png:
+        screenshot = pyautogui.screenshot()
+        screenshot.save(tmp_png.name)
+        return tmp_png.name
+
+
+def encode_image(image_path):
+    """Encode the image file as a Base64 string."""
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode("utf-8")
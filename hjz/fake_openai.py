@@ -0,0 +1,87 @@
+"""
+Minimal fake of the OpenAI endpoints used by the assistant.
+
+Run it locally and point the scripts at it to exercise the scheduler without
+spending real requests:
+
+    python -m hjz.fake_openai --port 5001 --rate-limit-every 3 --latency 0.5
+    OPENAI_BASE_URL=http://localhost:5001/v1 OPENAI_API_KEY=fake python httpclient/httpclient.py
+"""
+import argparse
+import itertools
+import threading
+import time
+from flask import Flask, Response, request, jsonify
+
+app = Flask(__name__)
+
+# Behaviour knobs, set from the command line.
+settings = {"latency": 0.0, "rate_limit_every": 0, "retry_after": 1}
+counter = itertools.count(1)
+counter_lock = threading.Lock()
+
+
+def simulate_upstream():
+    """Sleep for the configured latency and return a 429 response every N-th call."""
+    time.sleep(settings["latency"])
+    with counter_lock:
+        n = next(counter)
+    every = settings["rate_limit_every"]
+    if every and n % every == 0:
+        response = jsonify({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(settings["retry_after"])
+        return response
+    return None
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    limited = simulate_upstream()
+    if limited is not None:
+        return limited
+    body = request.get_json()
+    last = body["messages"][-1]["content"]
+    if isinstance(last, list):
+        last = " ".join(part.get("text", "") for part in last)
+    content = f"DIRECT: fake answer to '{last}'"
+    return jsonify({
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(last) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(last) + len(content)) // 4},
+    })
+
+
+@app.route('/v1/audio/transcriptions', methods=['POST'])
+def transcriptions():
+    limited = simulate_upstream()
+    if limited is not None:
+        return limited
+    text = "What did Sakura cook today?"
+    if request.form.get("response_format") == "text":
+        return Response(text + "\n", mimetype="text/plain")
+    return jsonify({"text": text})
+
+
+@app.route('/v1/audio/speech', methods=['POST'])
+def speech():
+    limited = simulate_upstream()
+    if limited is not None:
+        return limited
+    # A single silent MPEG frame header is enough for clients that only store the bytes.
+    return Response(b"\xff\xfb\x90\x00" + b"\x00" * 413, mimetype="audio/mpeg")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every N-th call with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After header sent with 429s")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, rate_limit_every=args.rate_limit_every, retry_after=args.retry_after)
+    app.run(port=args.port, threaded=True)
@@ -0,0 +1,25 @@
+"""
+Headless backends: stand-ins that load no GUI or audio libraries.
+
+Used by servers, workers and tests.  Turns are fed in as recorded files
+instead of being captured from the microphone.
+"""
+import os
+
+
+def record_audio(*args, **kwargs):
+    raise RuntimeError("No microphone in headless mode; pass an audio file to the pipeline instead.")
+
+
+def take_screenshot():
+    """There is no screen to capture, so turns are sent to the model as text only."""
+    return None
+
+
+def play_audio(path):
+    """There is no speaker; report the synthesized speech instead.  The caller deletes the file."""
+    print(f"Speech synthesized ({os.path.getsize(path)} bytes), not played in headless mode")
+
+
+def show_overlay(center_x, center_y, rect_length, rect_width, duration=5000):
+    print(f"Overlay at ({center_x}, {center_y}), {rect_length}x{rect_width} for {duration} ms")
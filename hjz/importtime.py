@@ -0,0 +1,94 @@
+"""
+Measure the cold-start import time of the assistant modules.
+
+Every module is imported in a fresh headless interpreter.  The check fails
+(exit code 1) if an import loads a GUI, audio or OpenAI library, or takes
+longer than the budget, so it can guard against startup regressions:
+
+    python -m hjz.importtime --budget-ms 150
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Modules (or script paths) that must import cheaply.
+TARGETS = [
+    "hjz",
+    "hjz.backends",
+    "hjz.pipeline",
+    "hjz.vision",
+    "hjz.scheduler",
+    os.path.join("httpclient", "httpclient.py"),
+    os.path.join("src", "AI_smartphone_teacher_mockup.py"),
+    os.path.join("src", "AI_smartphone_teacher_prototype.py"),
+]
+
+# Libraries that importing must never pull in.
+HEAVY_MODULES = [
+    "pyautogui",
+    "tkinter",
+    "sounddevice",
+    "scipy",
+    "keyboard",
+    "playsound",
+    "openai",
+    "numpy",
+    "requests",
+]
+
+PROBE = """
+import importlib.util, json, sys, time
+target, heavy = sys.argv[1], sys.argv[2].split(",")
+started = time.perf_counter()
+if target.endswith(".py"):
+    spec = importlib.util.spec_from_file_location("probe_target", target)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+else:
+    importlib.import_module(target)
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "heavy": [m for m in heavy if m in sys.modules]}))
+"""
+
+
+def measure(target, repeat=3):
+    """Import `target` in `repeat` fresh interpreters; return (best ms, heavy modules loaded)."""
+    env = dict(os.environ, HJZ_HEADLESS="1", PYTHONPATH=REPO_DIR)
+    best, heavy = None, set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, target, ",".join(HEAVY_MODULES)],
+            cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result["ms"] if best is None else min(best, result["ms"])
+        heavy.update(result["heavy"])
+    return best, sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the assistant modules.")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="maximum import time per target")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target (best is kept)")
+    parser.add_argument("targets", nargs="*", default=TARGETS)
+    args = parser.parse_args()
+
+    failed = False
+    for target in args.targets:
+        ms, heavy = measure(target, args.repeat)
+        problems = []
+        if heavy:
+            problems.append("loaded " + ", ".join(heavy))
+        if ms > args.budget_ms:
+            problems.append(f"over budget of {args.budget_ms:.0f} ms")
+        failed = failed or bool(problems)
+        status = "FAIL " + "; ".join(problems) if problems else "ok"
+        print(f"{target:45} {ms:8.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Red rectangle overlay used to point at parts of the phone screen.
+"""
+
+
+def show_overlay(center_x, center_y, rect_length, rect_width, duration=5000):
+    """
+    Create an overlay window that draws a red rectangle with a totally transparent background.
+
+    Arguments:
+    - center_x, center_y: Center coordinates of the rectangle on the screen.
+    - rect_length: The horizontal dimension (width in pixels) of the rectangle.
+    - rect_width: The vertical dimension (height in pixels) of the rectangle.
+    - duration: How long (in milliseconds) the overlay remains visible.
+    """
+    import tkinter as tk
+
+    overlay = tk.Tk()
+    overlay.overrideredirect(True)  # Remove window borders
+    overlay.attributes("-topmost", True)
+
+    # Set a unique background color and mark it as transparent.
+    transparent_color = "magenta"
+    overlay.config(bg=transparent_color)
+    overlay.wm_attributes("-transparentcolor", transparent_color)
+
+    # Calculate top-left corner so the rectangle is centered at (center_x, center_y)
+    top_left_x = center_x - rect_length // 2
+    top_left_y = center_y - rect_width // 2
+    overlay.geometry(f"{rect_length}x{rect_width}+{top_left_x}+{top_left_y}")
+
+    # Create a canvas with the same transparent background.
+    canvas = tk.Canvas(overlay, width=rect_length, height=rect_width,
+                       highlightthickness=0, bg=transparent_color)
+    canvas.pack()
+
+    # Draw a red rectangle outline. Only the outline will be visible.
+    canvas.create_rectangle(0, 0, rect_length, rect_width, outline="red", width=5)
+
+    # Close the overlay after 'duration' milliseconds.
+    overlay.after(duration, overlay.destroy)
+    overlay.mainloop()
@@ -0,0 +1,71 @@
+"""
+One assistant turn: record, transcribe, capture the screen, ask the model,
+then speak the answer while the overlay is shown.
+
+Capture, playback and overlay go through hjz.backends, so the same pipeline
+runs on the desktop and in headless mode.
+"""
+import os
+import threading
+
+from hjz import backends
+from hjz.transcription import transcribe_audio
+from hjz.tts import text_to_speech
+
+
+def run_turn(respond, overlay=None, audio_file=None, key="f8"):
+    """
+    Run a complete turn and return the response text, or None if no speech
+    was detected.
+
+    Arguments:
+    - respond: callable(request_text, screenshot_file) returning the reply text.
+    - overlay: keyword arguments for the overlay backend, or None for no overlay.
+    - audio_file: an existing recording to use instead of the microphone.
+    - key: the key held down while recording from the microphone.
+    """
+    if audio_file is None:
+        # Record until the key is released
+        from hjz.capture import save_wav
+        audio, sr = backends.load("recorder")(key)
+        if len(audio) == 0:
+            print("No audio recorded!")
+            return None
+        audio_file = save_wav(audio, sr)
+        recorded = True
+    else:
+        recorded = False
+
+    # Transcribe the spoken request
+    request_text = transcribe_audio(audio_file)
+    if recorded:
+        os.unlink(audio_file)
+    if not request_text:
+        print("No speech detected")
+        return None
+    print(f"Recognized request: {request_text}")
+
+    # Take a screenshot (None in headless mode)
+    screenshot_file = backends.load("screenshot")()
+
+    # Get response from the AI using both the request and the screenshot
+    response_text = respond(request_text, screenshot_file)
+    print(f"Response: {response_text}")
+    if screenshot_file is not None:
+        os.unlink(screenshot_file)
+
+    # Convert the response to speech and get the temporary MP3 file
+    speech_file = text_to_speech(response_text)
+
+    # Start playing the audio in a separate thread so it runs concurrently
+    audio_thread = threading.Thread(target=backends.load("player"), args=(speech_file,))
+    audio_thread.start()
+
+    # Display the overlay concurrently with the audio playback
+    if overlay is not None:
+        backends.load("overlay")(**overlay)
+
+    # Wait for the audio thread to finish, then delete the file
+    audio_thread.join()
+    os.unlink(speech_file)
+    return response_text
@@ -0,0 +1,505 @@
+"""
+Shared scheduler for all upstream OpenAI calls.
+
+The voice client, the data server, the smartphone teacher scripts and the
+fine-tuning notebook all send their chat, transcription and speech requests
+through a Scheduler instead of calling the OpenAI client directly.  The
+scheduler keeps a request bucket and a token bucket per model, serves queued
+requests by priority class, shares one upstream call between identical
+requests, drops requests whose deadline can no longer be met and adapts its
+concurrency to 429 responses and observed latency.
+
+A Scheduler only coordinates the requests of its own process.  Separate
+processes (voice client, data server, notebook) compete for one priority queue
+and one set of rate limits only when they submit to a shared scheduler server
+(hjz/scheduler_server.py) by setting HJZ_SCHEDULER_URL.  Processes that run
+their own scheduler should set HJZ_LIMIT_SHARE to the fraction of the account
+limits each may use; between them, priorities don't apply and only 429
+backoff protects against overrunning the limits.
+
+The OpenAI client is only created on first use.  Pass your own client (e.g.
+one pointed at hjz/fake_openai.py) to run everything against a local fake
+endpoint; setting OPENAI_BASE_URL has the same effect for the default client.
+The default client is built with max_retries=0, and a client you pass in must
+be too: otherwise the SDK retries 429s itself inside a worker, holding a
+concurrency slot regardless of priority, and the scheduler never sees them.
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Priority classes: a lower value is served first.
+INTERACTIVE = 0  # a live voice turn the user is waiting on
+LOOKUP = 1       # data lookups made on behalf of a turn
+BATCH = 2        # notebooks and other background jobs
+
+# Per-model limits as (requests per minute, tokens per minute).  A model name
+# is matched against the longest key it starts with, so fine-tuned models
+# ("ft:gpt-4o-2024-08-06:...") use the limits of their base model.
+DEFAULT_LIMITS = {
+    "gpt-4o": (500, 30000),
+    "gpt-4o-mini": (500, 200000),
+    "whisper-1": (50, None),
+    "tts-1": (50, None),
+}
+FALLBACK_LIMITS = (500, 30000)
+
+# Rough token cost of one image part in a chat message.
+IMAGE_TOKENS = 765
+# Completion tokens assumed when a chat call does not set max_tokens.
+DEFAULT_COMPLETION_TOKENS = 256
+
+# Maps a request kind to the client method that serves it.
+ENDPOINTS = {
+    "chat": lambda client: client.chat.completions.create,
+    "transcription": lambda client: client.audio.transcriptions.create,
+    "speech": lambda client: client.audio.speech.create,
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised for a request that could not be started before its deadline."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate` tokens per second.
+
+    The level may go negative when a request turns out to cost more than
+    estimated; later requests then wait until the debt is paid back.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.clock = clock
+        self.stamp = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, amount):
+        """Return how many seconds to wait until `amount` tokens are available."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        """
+        Remove `amount` tokens (a negative amount refunds them) and return the
+        amount actually removed, which is capped at the bucket's capacity.
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        self.level = min(self.capacity, self.level - amount)
+        return amount
+
+
+class ModelLimiter:
+    """Request bucket plus optional token bucket for a single model."""
+
+    def __init__(self, rpm, tpm=None, clock=time.monotonic):
+        self.requests = TokenBucket(rpm / 60.0, max(1, rpm // 60), clock)
+        self.tokens = TokenBucket(tpm / 60.0, max(1, tpm // 6), clock) if tpm else None
+
+    def delay(self, cost):
+        wait = self.requests.delay(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.delay(cost))
+        return wait
+
+    def take(self, cost):
+        """Charge one request and `cost` tokens; return the tokens charged."""
+        self.requests.take(1)
+        if self.tokens is None:
+            return 0
+        return self.tokens.take(cost)
+
+    def adjust(self, delta):
+        """Correct the token bucket once the real usage of a call is known."""
+        if self.tokens is not None and delta:
+            self.tokens.take(delta)
+
+
+class _Job:
+    """A queued upstream call and the future its callers wait on."""
+
+    def __init__(self, kind, model, kwargs, priority, deadline, cost, key):
+        self.kind = kind
+        self.model = model
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.cost = cost
+        self.key = key
+        self.future = Future()
+        self.state = "queued"
+        self.attempts = 0
+        self.not_before = 0.0
+        self.charged = 0
+
+
+def limits_for(model, limits):
+    """Look up the (rpm, tpm) pair for `model`, falling back to FALLBACK_LIMITS."""
+    name = model[3:] if model.startswith("ft:") else model
+    matches = [key for key in limits if name.startswith(key)]
+    if not matches:
+        return FALLBACK_LIMITS
+    return limits[max(matches, key=len)]
+
+
+def estimate_tokens(kind, kwargs):
+    """Estimate how many tokens a request will consume (about 4 characters per token)."""
+    if kind != "chat":
+        return 0
+    tokens = kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    for message in kwargs.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                if isinstance(part, str):
+                    tokens += len(part) // 4
+                elif part.get("type") == "image_url":
+                    tokens += IMAGE_TOKENS
+                else:
+                    tokens += len(part.get("text", "")) // 4
+        elif content:
+            tokens += len(content) // 4
+    return tokens
+
+
+def coalesce_key(kind, model, kwargs):
+    """Return a key shared by identical requests, or None if they can't be compared."""
+    try:
+        return json.dumps([kind, model, kwargs], sort_keys=True)
+    except (TypeError, ValueError):
+        # File uploads and other opaque arguments are never coalesced.
+        return None
+
+
+def is_rate_limited(exc):
+    return getattr(exc, "status_code", None) == 429
+
+
+def retry_after(exc):
+    """Read the Retry-After header of a 429 response, if the server sent one."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Scheduler:
+    """
+    Priority queue in front of the OpenAI client.
+
+    Arguments:
+    - client: OpenAI client to call, built with max_retries=0; created with
+      OpenAI(max_retries=0) on first use if omitted.
+    - limits: per-model (rpm, tpm) overrides merged into DEFAULT_LIMITS.
+    - limit_share: fraction of those limits this scheduler may use, for when
+      several processes each run their own scheduler against one account.
+    - max_concurrency, min_concurrency: bounds of the adaptive concurrency limit.
+    - target_latency: calls slower than this (seconds) shrink the concurrency limit.
+    - max_retries: how often a request is re-queued after a 429 response.
+    - backoff: base delay in seconds before retrying a rate-limited request.
+    """
+
+    def __init__(self, client=None, limits=None, limit_share=1.0, max_concurrency=8, min_concurrency=1,
+                 target_latency=10.0, max_retries=3, backoff=1.0, clock=time.monotonic):
+        self._client = client
+        self._limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._limit_share = limit_share
+        self._limiters = {}
+        self._max_concurrency = max_concurrency
+        self._min_concurrency = min_concurrency
+        self._concurrency = float(max_concurrency)
+        self._target_latency = target_latency
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._clock = clock
+        self._last_decrease = float("-inf")
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._pending = {}  # coalesce key -> job
+        self._inflight = 0
+        self._stats = {"submitted": 0, "coalesced": 0, "dropped": 0, "rate_limited": 0, "completed": 0}
+        self._closed = False
+
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="hjz-upstream")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="hjz-scheduler", daemon=True)
+        self._dispatcher.start()
+
+    # Public API -----------------------------------------------------------
+
+    def submit(self, kind, model, priority=INTERACTIVE, deadline=None, coalesce=True, **kwargs):
+        """
+        Queue an upstream call and return a Future for its response.
+
+        `kind` is one of "chat", "transcription" or "speech"; the remaining
+        keyword arguments are passed to the matching client method.  `deadline`
+        is the number of seconds the caller is willing to wait before the call
+        starts; requests that cannot start in time fail with DeadlineExceeded.
+        """
+        if kind not in ENDPOINTS:
+            raise ValueError(f"Unknown request kind: {kind}")
+        expires = self._clock() + deadline if deadline is not None else float("inf")
+        key = coalesce_key(kind, model, kwargs) if coalesce else None
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            self._stats["submitted"] += 1
+
+            job = self._pending.get(key) if key is not None else None
+            if job is not None:
+                # Share the call already queued or in flight, keeping the most
+                # urgent priority and the most generous deadline of all callers.
+                self._stats["coalesced"] += 1
+                job.deadline = max(job.deadline, expires)
+                if job.state == "queued" and priority < job.priority:
+                    job.priority = priority
+                    self._push(job)
+                return job.future
+
+            job = _Job(kind, model, kwargs, priority, expires, estimate_tokens(kind, kwargs), key)
+            if key is not None:
+                self._pending[key] = job
+            self._push(job)
+            return job.future
+
+    def chat(self, model, messages, priority=INTERACTIVE, deadline=None, **kwargs):
+        """Run a chat completion and wait for the response."""
+        return self.submit("chat", model, priority, deadline, messages=messages, **kwargs).result()
+
+    def transcribe(self, model, file, priority=INTERACTIVE, deadline=None, **kwargs):
+        """Run an audio transcription and wait for the response."""
+        return self.submit("transcription", model, priority, deadline, file=file, **kwargs).result()
+
+    def speech(self, model, input, voice, priority=INTERACTIVE, deadline=None, **kwargs):
+        """Run text-to-speech and wait for the binary audio response."""
+        return self.submit("speech", model, priority, deadline, input=input, voice=voice, **kwargs).result()
+
+    def stats(self):
+        """Return a snapshot of queue, concurrency and outcome counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            # An upgraded job has a stale second heap entry; count each job once.
+            snapshot["queued"] = len({id(job) for _, _, _, job in self._queue if job.state == "queued"})
+            snapshot["inflight"] = self._inflight
+            snapshot["concurrency"] = int(self._concurrency)
+            return snapshot
+
+    def shutdown(self, wait=True):
+        """Stop accepting requests, fail queued ones and wait for in-flight calls."""
+        with self._cond:
+            self._closed = True
+            for _, _, _, job in self._queue:
+                if job.state == "queued":
+                    self._finish(job, exception=RuntimeError("Scheduler has been shut down"))
+            self._queue = []
+            self._cond.notify_all()
+        self._pool.shutdown(wait=wait)
+
+    # Internals ------------------------------------------------------------
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import OpenAI
+            # 429s are retried by the scheduler, not the SDK
+            self._client = OpenAI(max_retries=0)
+        return self._client
+
+    def _limiter(self, model):
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            rpm, tpm = limits_for(model, self._limits)
+            share = self._limit_share
+            limiter = self._limiters[model] = ModelLimiter(rpm * share, tpm * share if tpm else None, self._clock)
+        return limiter
+
+    def _push(self, job):
+        # A job may appear more than once after a priority upgrade; stale
+        # entries are skipped when their priority no longer matches.
+        heapq.heappush(self._queue, (job.priority, job.deadline, next(self._counter), job))
+        self._cond.notify_all()
+
+    def _finish(self, job, result=None, exception=None):
+        job.state = "done"
+        if job.key is not None and self._pending.get(job.key) is job:
+            del self._pending[job.key]
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    def _next_job(self):
+        """
+        Pick the most urgent job that may start now.
+
+        Returns (job, None) when a job is ready, or (None, wait) with the number
+        of seconds until the earliest job could become ready.
+        """
+        now = self._clock()
+        wait = None
+        blocked = set()
+        self._queue = [entry for entry in self._queue
+                       if entry[3].state == "queued" and entry[0] == entry[3].priority]
+        heapq.heapify(self._queue)
+
+        for entry in sorted(self._queue):
+            job = entry[3]
+            if job.model in blocked:
+                # Don't let a less urgent job take budget a more urgent one is waiting for.
+                continue
+            delay = max(job.not_before - now, self._limiter(job.model).delay(job.cost))
+            if now + delay > job.deadline:
+                self._queue.remove(entry)
+                self._stats["dropped"] += 1
+                self._finish(job, exception=DeadlineExceeded(
+                    f"{job.kind} request to {job.model} could not start before its deadline"))
+                continue
+            if delay <= 0:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return job, None
+            blocked.add(job.model)
+            wait = delay if wait is None else min(wait, delay)
+        heapq.heapify(self._queue)
+        return None, wait
+
+    def _drop_expired(self):
+        """
+        Fail queued jobs whose deadline has passed and return the number of
+        seconds until the next queued deadline (None if no job has one).
+        """
+        now = self._clock()
+        earliest = None
+        for entry in list(self._queue):
+            job = entry[3]
+            if job.state != "queued":
+                continue
+            if job.deadline <= now:
+                self._queue.remove(entry)
+                self._stats["dropped"] += 1
+                self._finish(job, exception=DeadlineExceeded(
+                    f"{job.kind} request to {job.model} could not start before its deadline"))
+            elif job.deadline != float("inf"):
+                earliest = job.deadline if earliest is None else min(earliest, job.deadline)
+        heapq.heapify(self._queue)
+        return None if earliest is None else earliest - now
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while not self._closed:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                if self._inflight >= int(self._concurrency):
+                    # Saturated: keep dropping expired jobs so their callers
+                    # don't wait for a free slot to learn they missed it.
+                    self._cond.wait(self._drop_expired())
+                    continue
+                job, wait = self._next_job()
+                if job is None:
+                    self._cond.wait(wait)
+                    continue
+                job.state = "running"
+                job.attempts += 1
+                job.charged = self._limiter(job.model).take(job.cost)
+                self._inflight += 1
+                self._pool.submit(self._run, job)
+
+    def _run(self, job):
+        started = self._clock()
+        try:
+            file = job.kwargs.get("file")
+            if job.attempts > 1 and hasattr(file, "seek"):
+                file.seek(0)
+            response = ENDPOINTS[job.kind](self._get_client())(model=job.model, **job.kwargs)
+        except Exception as exc:
+            with self._cond:
+                self._inflight -= 1
+                if is_rate_limited(exc):
+                    self._stats["rate_limited"] += 1
+                    self._on_rate_limited()
+                    if self._closed:
+                        exc = RuntimeError("Scheduler has been shut down")
+                    elif job.attempts <= self._max_retries:
+                        delay = retry_after(exc) or self._backoff * 2 ** (job.attempts - 1)
+                        job.state = "queued"
+                        job.not_before = self._clock() + delay
+                        self._push(job)
+                        return
+                self._finish(job, exception=exc)
+                self._cond.notify_all()
+            return
+
+        latency = self._clock() - started
+        with self._cond:
+            self._inflight -= 1
+            usage = getattr(response, "usage", None)
+            total = getattr(usage, "total_tokens", None)
+            if isinstance(total, int):
+                self._limiter(job.model).adjust(total - job.charged)
+            self._on_success(latency)
+            self._stats["completed"] += 1
+            self._finish(job, result=response)
+            self._cond.notify_all()
+
+    def _on_rate_limited(self):
+        # Multiplicative decrease, at most once per second so that a burst of
+        # 429s from calls started together only halves the limit once.
+        now = self._clock()
+        if now - self._last_decrease >= 1.0:
+            self._concurrency = max(self._min_concurrency, self._concurrency / 2)
+            self._last_decrease = now
+
+    def _on_success(self, latency):
+        if latency > self._target_latency:
+            self._concurrency = max(self._min_concurrency, self._concurrency - 1)
+        else:
+            # Additive increase: roughly +1 per full window of fast responses.
+            self._concurrency = min(self._max_concurrency, self._concurrency + 1 / self._concurrency)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Return the process-wide scheduler shared by every caller: a client for the
+    scheduler server at HJZ_SCHEDULER_URL if set, otherwise a local Scheduler
+    limited to HJZ_LIMIT_SHARE (default 1.0) of the rate limits.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            url = os.getenv("HJZ_SCHEDULER_URL")
+            if url:
+                from hjz.scheduler_server import RemoteScheduler
+                _default = RemoteScheduler(url)
+            else:
+                _default = Scheduler(limit_share=float(os.getenv("HJZ_LIMIT_SHARE", "1.0")))
+        return _default
+
+
+def set_scheduler(scheduler):
+    """Replace the process-wide scheduler, e.g. with one using a custom client."""
+    global _default
+    with _default_lock:
+        _default = scheduler
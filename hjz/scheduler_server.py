@@ -0,0 +1,175 @@
+"""
+Scheduler shared between processes.
+
+The voice client, the data server and the notebook each run in their own
+process.  To let their requests compete in one priority queue under one set of
+rate limits, run a single scheduler server and point the processes at it:
+
+    python -m hjz.scheduler_server --port 5002
+    HJZ_SCHEDULER_URL=http://localhost:5002 python httpclient/httpclient.py
+
+hjz.scheduler.get_scheduler() then returns a RemoteScheduler, which has the
+same submit/chat/transcribe/speech interface as a local Scheduler.  Responses
+come back as plain attribute objects (response.choices[0].message.content,
+transcription.text, speech.content), so callers don't change.
+"""
+import argparse
+import base64
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from hjz.scheduler import DeadlineExceeded, INTERACTIVE, Scheduler
+
+
+class UpstreamError(Exception):
+    """An upstream call made by the scheduler server failed."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def encode_kwargs(kwargs):
+    """Make request arguments JSON-safe; file uploads are sent as Base64."""
+    encoded = dict(kwargs)
+    file = encoded.get("file")
+    if file is not None and hasattr(file, "read"):
+        name = os.path.basename(getattr(file, "name", "audio.wav"))
+        encoded["file"] = {"name": name, "data": base64.b64encode(file.read()).decode("ascii")}
+    return encoded
+
+
+def decode_kwargs(kwargs):
+    decoded = dict(kwargs)
+    file = decoded.get("file")
+    if isinstance(file, dict):
+        decoded["file"] = (file["name"], base64.b64decode(file["data"]))
+    return decoded
+
+
+def encode_response(response):
+    if isinstance(response, str):
+        return {"type": "text", "data": response}
+    if hasattr(response, "model_dump"):
+        return {"type": "json", "data": response.model_dump(mode="json")}
+    return {"type": "binary", "data": base64.b64encode(response.content).decode("ascii")}
+
+
+def to_attributes(value):
+    """Turn decoded JSON into nested objects with attribute access."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_attributes(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_attributes(item) for item in value]
+    return value
+
+
+def decode_response(payload):
+    if payload["type"] == "text":
+        return payload["data"]
+    if payload["type"] == "json":
+        return to_attributes(payload["data"])
+    return SimpleNamespace(content=base64.b64decode(payload["data"]))
+
+
+class RemoteScheduler:
+    """Client for a scheduler server, with the interface of a local Scheduler."""
+
+    def __init__(self, url, max_workers=8):
+        self.url = url.rstrip("/")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hjz-remote")
+
+    def _request(self, path, body=None):
+        import urllib.error
+        import urllib.request
+
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            error = json.loads(e.read() or b"{}")
+            if error.get("error") == "DeadlineExceeded":
+                raise DeadlineExceeded(error.get("message", ""))
+            raise UpstreamError(error.get("message", str(e)), error.get("status_code"))
+
+    def submit(self, kind, model, priority=INTERACTIVE, deadline=None, coalesce=True, **kwargs):
+        body = {"kind": kind, "model": model, "priority": priority, "deadline": deadline,
+                "coalesce": coalesce, "kwargs": encode_kwargs(kwargs)}
+        return self._pool.submit(lambda: decode_response(self._request("/submit", body)))
+
+    def chat(self, model, messages, priority=INTERACTIVE, deadline=None, **kwargs):
+        return self.submit("chat", model, priority, deadline, messages=messages, **kwargs).result()
+
+    def transcribe(self, model, file, priority=INTERACTIVE, deadline=None, **kwargs):
+        return self.submit("transcription", model, priority, deadline, file=file, **kwargs).result()
+
+    def speech(self, model, input, voice, priority=INTERACTIVE, deadline=None, **kwargs):
+        return self.submit("speech", model, priority, deadline, input=input, voice=voice, **kwargs).result()
+
+    def stats(self):
+        return self._request("/stats")
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class SchedulerHandler(BaseHTTPRequestHandler):
+    scheduler = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._reply(404, {"error": "NotFound"})
+        self._reply(200, self.scheduler.stats())
+
+    def do_POST(self):
+        if self.path != "/submit":
+            return self._reply(404, {"error": "NotFound"})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        try:
+            future = self.scheduler.submit(body["kind"], body["model"], body.get("priority", INTERACTIVE),
+                                           body.get("deadline"), body.get("coalesce", True),
+                                           **decode_kwargs(body.get("kwargs", {})))
+            self._reply(200, encode_response(future.result()))
+        except DeadlineExceeded as e:
+            self._reply(503, {"error": "DeadlineExceeded", "message": str(e)})
+        except Exception as e:
+            self._reply(502, {"error": type(e).__name__, "message": str(e),
+                              "status_code": getattr(e, "status_code", None)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(scheduler, host="localhost", port=5002):
+    """Serve `scheduler` over HTTP; returns the server running in a background thread."""
+    handler = type("BoundSchedulerHandler", (SchedulerHandler,), {"scheduler": scheduler})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="hjz-scheduler-server", daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run one scheduler shared by all assistant processes.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--limit-share", type=float, default=1.0,
+                        help="fraction of the account's rate limits this server may use")
+    args = parser.parse_args()
+    server = serve(Scheduler(limit_share=args.limit_share), args.host, args.port)
+    print(f"Scheduler listening on http://{args.host}:{args.port}")
+    threading.Event().wait()
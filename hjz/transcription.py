@@ -0,0 +1,15 @@
+"""
+Speech to text through the shared scheduler.
+"""
+from hjz.scheduler import get_scheduler, INTERACTIVE
+
+
+def transcribe_audio(audio_file, model="whisper-1", priority=INTERACTIVE):
+    """Convert speech to text using OpenAI's Whisper ASR."""
+    with open(audio_file, "rb") as f:
+        transcription = get_scheduler().transcribe(
+            model=model,
+            file=f,
+            priority=priority
+        )
+    return transcription.text.strip()
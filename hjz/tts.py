@@ -0,0 +1,26 @@
+"""
+Text to speech through the shared scheduler, and desktop audio playback.
+"""
+import tempfile
+
+from hjz.scheduler import get_scheduler, INTERACTIVE
+
+
+def text_to_speech(text, model="tts-1", voice="alloy", priority=INTERACTIVE):
+    """Convert text to speech and save to a temporary MP3 file."""
+    response = get_scheduler().speech(
+        model=model,
+        voice=voice,
+        input=text,
+        priority=priority
+    )
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as f:
+        f.write(response.content)
+        return f.name
+
+
+def play_audio(path):
+    """Play an audio file on the default output device."""
+    from playsound import playsound
+
+    playsound(path)
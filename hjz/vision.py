@@ -0,0 +1,40 @@
+"""
+Chat requests that combine the spoken request with a screenshot.
+"""
+from hjz.capture import encode_image
+from hjz.scheduler import get_scheduler, INTERACTIVE
+
+
+def screenshot_message(request_text, screenshot_file):
+    """
+    Build the user message for a turn: the request text plus the screenshot as
+    a Base64 image.  Without a screenshot (headless mode) only the text is sent.
+    """
+    if screenshot_file is None:
+        return {"role": "user", "content": request_text}
+    base64_image = encode_image(screenshot_file)
+    message_content = [
+        {
+            "type": "text",
+            "text": request_text,
+        },
+        {
+            "type": "image_url",
+            "image_url": {"url": f"data:image/png;base64,{base64_image}"},
+        },
+    ]
+    return {"role": "user", "content": message_content}
+
+
+def chat_with_screenshot(model, history, request_text, screenshot_file, priority=INTERACTIVE):
+    """
+    Send `history` (system prompt and earlier text-only turns) followed by the
+    composite message for this turn, and return the assistant's reply.
+    """
+    messages = list(history) + [screenshot_message(request_text, screenshot_file)]
+    response = get_scheduler().chat(
+        model=model,
+        messages=messages,
+        priority=priority,
+    )
+    return response.choices[0].message.content.strip()
@@ -1,73 +1,62 @@
 import os
-import openai
-import keyboard
-import sounddevice as sd
-import numpy as np
-import tempfile
-import time
+import json
 import threading
-import requests  # Make sure to install requests (pip install requests)
-from scipy.io.wavfile import write
-from playsound import playsound
 
-# OpenAI API Key Setup
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key not found! Set it as an environment variable.")
-openai.api_key = OPENAI_API_KEY
+from hjz import backends
+from hjz.capture import save_wav
+from hjz.transcription import transcribe_audio
+from hjz.tts import text_to_speech as synthesize_speech
+from hjz.scheduler import get_scheduler, INTERACTIVE
+
+# Router labels, kept here so that numpy is only imported with the router itself
+DIRECT = "DIRECT"
+REQUEST = "REQUEST"
 
 # Audio Configuration
 SAMPLE_RATE = 44100  # 44.1 kHz
-CHANNELS = 1  # Mono
-RECORDING = False
-audio_data = []  # Stores recorded audio samples
-
-def start_recording():
-    global RECORDING, audio_data
-    if not RECORDING:
-        print("Recording started... Speak now!")
-        RECORDING = True
-        audio_data = []  # Reset previous audio
-        with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, callback=callback):
-            while RECORDING:
-                time.sleep(0.1)
-
-def stop_recording():
-    global RECORDING
-    if RECORDING:
-        RECORDING = False
-        print("Recording stopped. Processing audio...")
-        threading.Thread(target=process_audio, daemon=True).start()
-
-def callback(indata, frames, time_info, status):
-    if status:
-        print(status)
-    if RECORDING:
-        audio_data.append(indata.copy())
-
-def process_audio():
-    global audio_data
-    if not audio_data:
-        print("No audio recorded!")
-        return
+recording_lock = threading.Lock()  # Held while the microphone is recording
 
-    # Concatenate all recorded numpy arrays
-    audio_array = np.concatenate(audio_data, axis=0)
+# Key bindings: Hold space to record, release to stop and process
+KEY_TO_HOLD = "space"
+_intent_router = None
+
+def get_intent_router():
+    """
+    Load the local intent router on first use; train it with
+    `python -m hjz.router train`.  Returns None without a saved model, in which
+    case every turn uses the GPT-4o decision call.
+    """
+    global _intent_router
+    if _intent_router is None:
+        from hjz import router
+        _intent_router = router.IntentRouter.load() if os.path.exists(router.MODEL_PATH) else False
+    return _intent_router or None
 
-    # Save to a temporary WAV file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio_file:
-        temp_filename = temp_audio_file.name
-        write(temp_filename, SAMPLE_RATE, (audio_array * 32767).astype(np.int16))
+def process_audio(audio_file=None):
+    """
+    Record while the key is held (or use an existing `audio_file`, e.g. in
+    headless mode), transcribe the recording and respond to it.
+    """
+    if audio_file is None:
+        if not recording_lock.acquire(blocking=False):
+            return  # key auto-repeat while a recording is already running
+        try:
+            audio, sr = backends.load("recorder")(KEY_TO_HOLD, SAMPLE_RATE)
+        finally:
+            recording_lock.release()
+        if len(audio) == 0:
+            print("No audio recorded!")
+            return
+        print("Recording stopped. Processing audio...")
+        audio_file = save_wav(audio, sr)
+        recorded = True
+    else:
+        recorded = False
 
     # Transcribe audio using OpenAI Whisper
-    with open(temp_filename, "rb") as audio_file:
-        transcript = openai.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="text"
-        )
-    os.remove(temp_filename)
-    transcribed_text = transcript.strip()
+    transcribed_text = transcribe_audio(audio_file)
+    if recorded:
+        os.remove(audio_file)
     print(f"Transcribed: {transcribed_text}")
 
     if transcribed_text:
@@ -75,6 +64,7 @@ def process_audio():
 
 def query_http_server(identifier):
     """Query the HTTP server to retrieve additional information based on the identifier."""
+    import requests  # Make sure to install requests (pip install requests)
     try:
         # Adjust the URL and payload as needed for your HTTP server
         response = requests.post("http://localhost:5000/data", json={"query": identifier})
@@ -85,66 +75,102 @@ def query_http_server(identifier):
     except Exception as e:
         return f"Error connecting to HTTP server: {e}"
 
+def log_turn(text, label, identifier=None):
+    """Record the model's decision so the intent router can be retrained on it."""
+    from hjz.router import TURN_LOG_PATH
+    with open(TURN_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"text": text, "label": label, "identifier": identifier}) + "\n")
+
 def get_gpt_response(text):
     """
     Two-step approach:
-    1. Ask GPT‑4o whether additional info is needed.
+    1. Decide whether additional info is needed, locally with the intent router
+       when it is confident and with a GPT‑4o call otherwise.
     2. If yes, query the HTTP server and include that data in a second GPT‑4o call.
     """
+    intent_router = get_intent_router()
+    route = intent_router.route(text) if intent_router else None
+    if route is not None:
+        print(f"Router decision: {route.label} {route.identifier or ''} ({route.confidence:.2f})")
+        if route.label == REQUEST:
+            respond_with_additional_info(text, route.identifier)
+        else:
+            respond_directly(text)
+        return
+
     # Step 1: Determine if extra info is needed
     prompt_decision = (
         f"Based on the input: '{text}', first decide if additional data from an external HTTP server is necessary. "
         "If additional data is needed, respond with 'REQUEST: <identifier>' where <identifier> is the key to query. "
         "If not needed, respond to the input directly with 'DIRECT: <your final answer>'. This response should not mention your decision of additional data."
     )
-    decision_response = openai.chat.completions.create(
+    decision_response = get_scheduler().chat(
         model="gpt-4o",
-        messages=[{"role": "user", "content": prompt_decision}]
+        messages=[{"role": "user", "content": prompt_decision}],
+        priority=INTERACTIVE
     )
     decision_text = decision_response.choices[0].message.content.strip()
     print(f"GPT-4o decision: {decision_text}")
 
     if decision_text.startswith("DIRECT:"):
         # Direct response – no extra info required
+        log_turn(text, DIRECT)
         final_response = decision_text[len("DIRECT:"):].strip()
         print(f"GPT-4o (direct): {final_response}")
         text_to_speech(final_response)
     elif decision_text.startswith("REQUEST:"):
         # Extra info is required. Extract the identifier and query the HTTP server.
         identifier = decision_text[len("REQUEST:"):].strip()
-        additional_info = query_http_server(identifier)
-        print(f"Additional info from HTTP server: {additional_info}")
-
-        # Step 2: Use the additional info in a second GPT‑4o call
-        prompt_final = (
-            f"Given the user prompt: '{text}' and the following additional data: '{additional_info}' related to {identifier}, "
-            "please provide a complete and final response."
-        )
-        final_response_obj = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt_final}]
-        )
-        final_response = final_response_obj.choices[0].message.content.strip()
-        print(f"GPT-4o (with additional info): {final_response}")
-        text_to_speech(final_response)
+        log_turn(text, REQUEST, identifier)
+        respond_with_additional_info(text, identifier)
     else:
         print("Unexpected response format from GPT-4o.")
 
-def text_to_speech(text):
-    response = openai.audio.speech.create(
-        model="tts-1",
-        voice="alloy",
-        input=text
+def respond_directly(text):
+    """Answer a turn the router marked as not needing external data."""
+    response = get_scheduler().chat(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": text}],
+        priority=INTERACTIVE
+    )
+    final_response = response.choices[0].message.content.strip()
+    print(f"GPT-4o (direct): {final_response}")
+    text_to_speech(final_response)
+
+def respond_with_additional_info(text, identifier):
+    """Query the HTTP server for `identifier` and answer with that data."""
+    additional_info = query_http_server(identifier)
+    print(f"Additional info from HTTP server: {additional_info}")
+
+    # Step 2: Use the additional info in a second GPT‑4o call
+    prompt_final = (
+        f"Given the user prompt: '{text}' and the following additional data: '{additional_info}' related to {identifier}, "
+        "please provide a complete and final response."
+    )
+    final_response_obj = get_scheduler().chat(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": prompt_final}],
+        priority=INTERACTIVE
     )
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio_file:
-        temp_filename = temp_audio_file.name
-        temp_audio_file.write(response.content)
-    playsound(temp_filename)
+    final_response = final_response_obj.choices[0].message.content.strip()
+    print(f"GPT-4o (with additional info): {final_response}")
+    text_to_speech(final_response)
 
-# Key bindings: Hold space to record, release to stop and process
-KEY_TO_HOLD = "space"
-keyboard.on_press_key(KEY_TO_HOLD, lambda _: threading.Thread(target=start_recording, daemon=True).start())
-keyboard.on_release_key(KEY_TO_HOLD, lambda _: threading.Thread(target=stop_recording, daemon=True).start())
+def text_to_speech(text):
+    speech_file = synthesize_speech(text)
+    backends.load("player")(speech_file)
+    os.remove(speech_file)  # Clean up the temporary MP3 file after playback
+
+def main():
+    # OpenAI API Key Setup
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OpenAI API key not found! Set it as an environment variable.")
+
+    import keyboard
+    keyboard.on_press_key(KEY_TO_HOLD, lambda _: threading.Thread(target=process_audio, daemon=True).start())
+
+    print(f"Hold '{KEY_TO_HOLD}' to start speaking, release to transcribe and respond!")
+    keyboard.wait("esc")
 
-print(f"Hold '{KEY_TO_HOLD}' to start speaking, release to transcribe and respond!")
-keyboard.wait("esc")
+if __name__ == '__main__':
+    main()
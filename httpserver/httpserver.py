@@ -3,11 +3,17 @@ import json
 from flask import Flask, request, jsonify
 import openai
 
+from hjz.scheduler import get_scheduler, LOOKUP, DeadlineExceeded
+
 # Retrieve the OpenAI API key from environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OpenAI API key not found! Set it as an environment variable.")
 openai.api_key = OPENAI_API_KEY
+scheduler = get_scheduler()
+
+# Seconds a lookup may wait in the scheduler queue before it is dropped
+LOOKUP_DEADLINE = 20
 
 app = Flask(__name__)
 
@@ -33,12 +39,14 @@ def gpt_4o_search(query, data):
         f"Select the text that best matches the query: '{query}'. "
         "If no text matches, respond with 'No matching text found.'"
     )
-    response = openai.chat.completions.create(
+    response = scheduler.chat(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": prompt}
-        ]
+        ],
+        priority=LOOKUP,
+        deadline=LOOKUP_DEADLINE
     )
     return response.choices[0].message.content.strip()
 
@@ -49,7 +57,10 @@ def data_request():
         return jsonify({"error": "No query provided"}), 400
 
     query = req_data['query']
-    response_text = gpt_4o_search(query, data)
+    try:
+        response_text = gpt_4o_search(query, data)
+    except DeadlineExceeded:
+        return jsonify({"error": "Upstream is busy, try again later"}), 503
     return jsonify({"response": response_text})
 
 if __name__ == '__main__':